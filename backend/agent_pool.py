@@ -0,0 +1,336 @@
+import json
+import os
+import queue
+import signal
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:  # optional, falls back to /proc on Linux
+    psutil = None
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_worker.py")
+
+# Frame: 4-byte big-endian length followed by compact JSON
+_HEADER = struct.Struct(">I")
+
+
+def write_frame(stream: BinaryIO, message: Dict[str, Any]) -> None:
+    """Write one length-prefixed JSON message"""
+    payload = json.dumps(message, separators=(",", ":"), default=str).encode("utf-8")
+    stream.write(_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def read_frame(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Read one length-prefixed JSON message, None on EOF"""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (length,) = _HEADER.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload)
+
+
+def process_tree(pid: int) -> List[int]:
+    """
+    Pid and all its descendants.
+
+    Playwright starts browsers in their own process group, so the parent
+    chain is followed rather than the worker's process group.
+    """
+    if psutil is not None:
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return [pid]
+    if not os.path.isdir("/proc"):
+        return [pid]
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Fields after the ")" closing the command name: state ppid ...
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def _rss_bytes(pid: int) -> int:
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_tree_rss_mb(pid: int) -> float:
+    """Resident memory of a process and its descendants (the browsers) in MB, 0 when unknown"""
+    return sum(_rss_bytes(p) for p in process_tree(pid)) / (1024 * 1024)
+
+
+def _start_time(pid: int) -> Optional[float]:
+    """Process start time, used to tell a process from a later one reusing its pid"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # starttime is field 22, the 20th after the ")" closing the command name
+            return float(f.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def snapshot_tree(pid: int) -> Dict[int, Optional[float]]:
+    """Pids of a process tree with their start times"""
+    return {p: _start_time(p) for p in process_tree(pid)}
+
+
+def _kill_pids(pids: Dict[int, Optional[float]]) -> None:
+    for pid, started in pids.items():
+        # Skip pids that exited and were reused by an unrelated process
+        if started is not None and _start_time(pid) != started:
+            continue
+        try:
+            if psutil is not None:
+                psutil.Process(pid).kill()
+            else:
+                os.kill(pid, signal.SIGKILL)
+        except Exception:  # already gone or not ours
+            pass
+
+
+class WorkerError(Exception):
+    """Raised when a worker dies or hangs while running a task"""
+
+
+class _Worker:
+    """
+    One agent worker subprocess.
+
+    Messages from the worker are read on a background thread and queued, so
+    a dead worker is noticed as soon as its stdout closes.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.tasks_run = 0
+        self.rss_mb = 0.0
+        self._job_id = 0
+        # Last seen process tree (pid -> start time), kept so the browsers of a
+        # worker that died can still be killed once they are reparented
+        self.known_tree: Dict[int, Optional[float]] = {}
+        self._messages: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=os.path.dirname(WORKER_SCRIPT),
+            # Own process group, so a kill also reaches helpers that stay in it
+            start_new_session=os.name == "posix",
+        )
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self) -> None:
+        while (message := read_frame(self.process.stdout)) is not None:
+            self._messages.put(message)
+        self._messages.put(None)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _record_tree(self) -> None:
+        if self.alive():
+            self.known_tree = snapshot_tree(self.process.pid)
+
+    def _descendants(self) -> Dict[int, Optional[float]]:
+        pids = {**self.known_tree, **snapshot_tree(self.process.pid)}
+        pids.pop(self.process.pid, None)
+        return pids
+
+    def cleanup(self) -> None:
+        """Kill what is left of a dead worker's process tree"""
+        self.known_tree.pop(self.process.pid, None)
+        _kill_pids(self.known_tree)
+        self.known_tree = {}
+
+    def run(self, task: Dict[str, Any], on_step: Optional[Callable] = None,
+            timeout: Optional[float] = None) -> Any:
+        """Run a task in the worker and wait for its result"""
+        self._job_id += 1
+        job_id = self._job_id
+        try:
+            write_frame(self.process.stdin, {"t": "run", "id": job_id, "task": task})
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"worker {self.process.pid} is not accepting tasks: {e}")
+
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            remaining = deadline - time.monotonic() if deadline else None
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                message = self._messages.get(timeout=remaining)
+            except queue.Empty:
+                self.kill()
+                raise WorkerError(f"worker {self.process.pid} timed out after {timeout}s")
+
+            if message is None:
+                code = self.process.wait()
+                self.cleanup()
+                raise WorkerError(f"worker {self.process.pid} exited with code {code}")
+            if message.get("id") != job_id:
+                # Left over from an earlier job, never mix it into this one
+                continue
+            self._record_tree()
+            if message["t"] == "log":
+                self.log.add_entry(action=message["a"], details=message["d"], category=message["c"])
+            elif message["t"] == "step" and on_step:
+                on_step(message["e"])
+            elif message["t"] == "result":
+                self.tasks_run += 1
+                self.rss_mb = process_tree_rss_mb(self.process.pid)
+                return message["r"]
+
+    def stop(self, timeout: float = 10) -> None:
+        """Ask the worker to exit, kill it if it does not, then kill leftover browsers"""
+        pids = self._descendants()
+        try:
+            write_frame(self.process.stdin, {"t": "stop"})
+            self.process.wait(timeout=timeout)
+        except (BrokenPipeError, OSError, subprocess.TimeoutExpired):
+            self.kill()
+        # Descendants are reparented once the worker exits, so use the tree taken before
+        _kill_pids(pids)
+
+    def kill(self) -> None:
+        """Kill the worker and everything it started, browsers included"""
+        pids = self._descendants()
+        try:
+            if os.name == "posix":
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+        _kill_pids(pids)
+        self.process.wait()
+
+
+class AgentPool:
+    """
+    Pool of worker subprocesses running `run_browser_agent_v2`.
+
+    Each worker runs one task at a time. Workers are spawned on demand up to
+    `size`, recycled after `max_tasks_per_worker` tasks or once the RSS of the
+    worker plus its browser processes exceeds `max_rss_mb`, and replaced when
+    they die or exceed `task_timeout`. A crashing or leaking task therefore
+    never takes down the desktop UI.
+    """
+
+    def __init__(self, log, size: int = 2, max_tasks_per_worker: int = 20,
+                 max_rss_mb: float = 1024, task_timeout: float = 900):
+        self.log = log
+        self.size = size
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_rss_mb = max_rss_mb
+        self.task_timeout = task_timeout
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> _Worker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = _Worker(self.log)
+                self._workers.add(worker)
+                return worker
+        return self._idle.get()
+
+    def _replace(self, worker: _Worker, reason: str, kill: bool = False) -> _Worker:
+        if kill:
+            worker.kill()
+        elif worker.alive():
+            worker.stop()
+        else:
+            worker.cleanup()
+        self.log.add_entry(
+            action='agent_pool_recycle',
+            details={
+                'pid': worker.process.pid,
+                'reason': reason,
+                'tasks_run': worker.tasks_run,
+                'rss_mb': worker.rss_mb
+            },
+            category='system'
+        )
+        replacement = _Worker(self.log)
+        with self._lock:
+            self._workers.discard(worker)
+            self._workers.add(replacement)
+        return replacement
+
+    def run(self, task: Dict[str, Any], on_step: Optional[Callable] = None) -> Any:
+        """Run a task on an idle worker, blocking until it finishes"""
+        worker = self._acquire()
+        try:
+            if not worker.alive():
+                worker = self._replace(worker, 'dead')
+            try:
+                result = worker.run(task, on_step=on_step, timeout=self.task_timeout)
+            except WorkerError as e:
+                worker = self._replace(worker, str(e))
+                return {
+                    "status": "error",
+                    "error": str(e)
+                }
+            except BaseException as e:
+                # The worker may still be mid-job, never hand it to the next task
+                worker = self._replace(worker, f'run interrupted: {e!r}', kill=True)
+                raise
+            if worker.tasks_run >= self.max_tasks_per_worker:
+                worker = self._replace(worker, 'max_tasks')
+            elif self.max_rss_mb and worker.rss_mb > self.max_rss_mb:
+                worker = self._replace(worker, 'max_rss')
+            return result
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        """Stop all workers"""
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            if worker.alive():
+                worker.stop()
+            else:
+                worker.cleanup()
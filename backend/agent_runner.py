@@ -0,0 +1,135 @@
+import os
+
+from langchain_openai import ChatOpenAI
+from browser_use import Agent, AgentHistoryList, Browser, BrowserConfig
+from dotenv import load_dotenv
+
+from network_profile import NetworkProfile, BlockingBrowserContext
+from scheduler import is_captcha_page
+load_dotenv()
+
+# Request-interception profile for agent contexts, set BLOCK_RESOURCES=false to load everything
+network_profile = NetworkProfile(
+    enabled=os.getenv('BLOCK_RESOURCES', 'true').lower() != 'false',
+)
+
+
+def _step_callback(on_step):
+    """Adapt browser-use's step callback to a compact step event dict"""
+    def callback(state, model_output, step):
+        actions = getattr(model_output, 'action', None) or []
+        on_step({
+            "step": step,
+            "url": getattr(state, 'url', None),
+            "actions": [action.model_dump(exclude_unset=True) for action in actions]
+        })
+    return callback
+
+
+async def run_browser_agent_v2(task, log, on_step=None):
+    """
+    Run the browser agent to execute the task
+    
+    Args:
+        task (dict): Task information containing target_website, google_search_keyword, etc.
+        log (LogHistory): Log to record the run in
+        on_step (callable, optional): Called with a step event dict after each agent step
+        
+    Returns:
+        dict: Result of the browser agent execution
+    """
+    message = None
+    browser_context = None
+    try:
+        target_website = task.get('target_website')
+        google_search_keyword = task.get('google_search_keyword')
+        loop_count = task.get('loop', 1)
+
+        # Create the task message
+        message = f"""
+1. Access Google:
+    * Open your browser and navigate to https://google.com.
+2. Search for the Keyword:
+    * In the Google search bar, type "{google_search_keyword}" and press Enter.
+3. Locate the Specific Domain in Results:
+    * Check the search results for links under the domain {target_website} (very important).
+    * If not found on the current page: Scroll to end page click the "Next" button (or next page numbers) at the bottom of Google to check subsequent pages.
+4. Visit the Target Website:
+    * Once you find a result matching the domain, click the link to navigate to {target_website}.
+"""
+        
+        llm2 = ChatOpenAI(model="gpt-4o-mini")
+        browser_use_browser2 = Browser(
+            config=BrowserConfig(
+                headless=False,
+                # chrome_instance_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',  # macOS path
+                # extra_chromium_args=['--profile-directory=Default'],
+            )
+        )
+
+        browser_context = BlockingBrowserContext(
+            browser=browser_use_browser2,
+            config=browser_use_browser2.config.new_context_config,
+            network_profile=network_profile.for_target(target_website),
+        )
+
+        agent = Agent(
+            task=message,
+            llm=llm2,
+            browser=browser_use_browser2,
+            browser_context=browser_context,
+            use_vision=False,
+            max_failures=2,
+            max_actions_per_step=1,
+            register_new_step_callback=_step_callback(on_step) if on_step else None
+        )
+            
+        # Execute the agent
+        try:
+            history: AgentHistoryList = await agent.run()
+        finally:
+            await browser_context.close()
+        result = history.final_result()
+
+        # Google (or the target) served a captcha, the caller backs off
+        titles = [getattr(item.state, 'title', None) for item in history.history]
+        if is_captcha_page(urls=history.urls(), titles=titles):
+            log.add_entry(
+                action='captcha_detected',
+                details={
+                    'message': message,
+                    'urls': history.urls(),
+                    'network': browser_context.network_stats.to_dict()
+                }
+            )
+            return {
+                "status": "captcha",
+                "error": "Captcha detected"
+            }
+
+        # Log the result
+        log.add_entry(
+            action='run_browser_agent',
+            details={
+                'message': message,
+                'result': result,
+                'network': browser_context.network_stats.to_dict()
+            }
+        )
+
+        return result  
+      
+    except Exception as e:
+        error_message = str(e)
+        log.add_entry(
+            action='run_browser_agent',
+            details={
+                'message': message,
+                'error': error_message,
+                'network': browser_context.network_stats.to_dict() if browser_context else None
+            }
+        )
+        return {
+            "status": "error",
+            "error": error_message
+        }
@@ -0,0 +1,58 @@
+"""
+Agent worker subprocess started by AgentPool.
+
+Reads `run` / `stop` frames from stdin and writes `step`, `log` and `result`
+frames to stdout (see agent_pool.write_frame). Anything else printed by the
+agent goes to stderr so it cannot corrupt the protocol stream.
+"""
+import asyncio
+import os
+import sys
+
+from agent_pool import read_frame, write_frame
+
+
+class IpcLog:
+    """LogHistory stand-in that forwards entries to the parent process"""
+
+    def __init__(self, send):
+        self.send = send
+        self.job_id = None
+
+    def add_entry(self, action, details, category="general"):
+        self.send({"t": "log", "id": self.job_id, "a": action, "d": details, "c": category})
+
+
+def main():
+    ipc_in = sys.stdin.buffer
+    ipc_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def send(message):
+        write_frame(ipc_out, message)
+
+    # Heavy imports after stdout is redirected
+    from agent_runner import run_browser_agent_v2
+
+    log = IpcLog(send)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        while (message := read_frame(ipc_in)) is not None:
+            if message["t"] == "stop":
+                break
+            if message["t"] == "run":
+                job_id = message["id"]
+                log.job_id = job_id
+                result = loop.run_until_complete(run_browser_agent_v2(
+                    message["task"],
+                    log,
+                    on_step=lambda event: send({"t": "step", "id": job_id, "e": event})
+                ))
+                send({"t": "result", "id": job_id, "r": result})
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
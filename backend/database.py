@@ -1,3 +1,4 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.ext.asyncio import AsyncEngine
@@ -28,4 +29,22 @@ async def get_db():
             await session.rollback()
             raise
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close()
+
+def add_missing_columns(sync_conn):
+    """Add model columns and indexes missing from existing tables (create_all only creates new tables)"""
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+            if column.default is not None and column.default.is_scalar:
+                ddl += f' DEFAULT {column.default.arg!r}'
+            sync_conn.execute(text(ddl))
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
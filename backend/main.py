@@ -3,10 +3,11 @@ from fastapi.middleware.cors import CORSMiddleware
 import webview as pywebview
 import os
 from pydantic import SecretStr
-from database import Base, engine
+from database import Base, engine, add_missing_columns, AsyncSessionLocal
 from sqlalchemy.ext.asyncio import AsyncSession
 from models import Task  # Import Task model to ensure it's registered
 from task_db_handle import TaskDBHandler
+from scheduler import SchedulingPolicy
 
 pywebview.debug = True
 
@@ -18,8 +19,13 @@ from browser_use import Agent, AgentHistoryList, Browser, BrowserConfig
 from dotenv import load_dotenv
 import asyncio
 import json
+import threading
+import time
 load_dotenv()
 
+from agent_runner import run_browser_agent_v2
+from agent_pool import AgentPool
+
 # Initialize FastAPI app
 app = FastAPI()
 
@@ -28,6 +34,19 @@ app = FastAPI()
 async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+
+    # A crash or closing the app mid-run leaves tasks in `doing`, and claims only live in memory
+    async with AsyncSessionLocal() as session:
+        requeued = await TaskDBHandler(session).requeue_interrupted_tasks()
+    if requeued:
+        log.add_entry(
+            action='requeue_interrupted_tasks',
+            details={
+                'task_ids': [task.id for task in requeued]
+            },
+            category='system'
+        )
 
 def init_database():
     """Initialize database tables"""
@@ -54,6 +73,24 @@ llm = ChatOpenAI(model="gpt-4o")
 #     api_key=SecretStr(api_key),
 # )
 
+# Rate limits, fair-share ordering and captcha backoff for task runs
+scheduler = SchedulingPolicy()
+
+# Execution mode, AGENT_EXECUTION=process runs agents in a pool of worker subprocesses
+agent_pool = None
+if os.getenv('AGENT_EXECUTION', 'inline') == 'process':
+    agent_pool = AgentPool(
+        log,
+        size=int(os.getenv('AGENT_POOL_SIZE', '2')),
+        max_tasks_per_worker=int(os.getenv('AGENT_MAX_TASKS_PER_WORKER', '20')),
+        max_rss_mb=float(os.getenv('AGENT_MAX_RSS_MB', '1024')),
+        task_timeout=float(os.getenv('AGENT_TASK_TIMEOUT', '900')),
+    )
+
+# Tasks handed out by get_next_task and not finished yet, so parallel runners never pick the same task
+claimed_task_ids = set()
+claimed_task_ids_lock = threading.Lock()
+
 browser_use_browser = Browser(
     config=BrowserConfig(
         headless=False,
@@ -62,80 +99,121 @@ browser_use_browser = Browser(
     )
 )
 
-async def run_browser_agent_v2(task):
-    """
-    Run the browser agent to execute the task
-    
-    Args:
-        task (dict): Task information containing target_website, google_search_keyword, etc.
-        
-    Returns:
-        dict: Result of the browser agent execution
-    """
-    try:
-        target_website = task.get('target_website')
-        google_search_keyword = task.get('google_search_keyword')
-        loop_count = task.get('loop', 1)
-
-        # Create the task message
-        message = f"""
-1. Access Google:
-    * Open your browser and navigate to https://google.com.
-2. Search for the Keyword:
-    * In the Google search bar, type "{google_search_keyword}" and press Enter.
-3. Locate the Specific Domain in Results:
-    * Check the search results for links under the domain {target_website} (very important).
-    * If not found on the current page: Scroll to end page click the "Next" button (or next page numbers) at the bottom of Google to check subsequent pages.
-4. Visit the Target Website:
-    * Once you find a result matching the domain, click the link to navigate to {target_website}.
-"""
-        
-        llm2 = ChatOpenAI(model="gpt-4o-mini")
-        browser_use_browser2 = Browser(
-            config=BrowserConfig(
-                headless=False,
-                # chrome_instance_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',  # macOS path
-                # extra_chromium_args=['--profile-directory=Default'],
-            )
-        )
+def serialize_task(task):
+    """Convert a Task row to a JSON-friendly dict for the frontend"""
+    return {
+        "id": task.id,
+        "target_website": task.target_website,
+        "search_keyword": task.search_keyword,
+        "loop": task.loop,
+        "status": task.status,
+        "ordering": task.ordering,
+        "priority": task.priority,
+        "campaign": task.campaign,
+        "revision": task.revision,
+        "date_add": task.date_add.isoformat() if task.date_add else None
+    }
+
+
+def serialize_changes(changes):
+    """Convert TaskDBHandler.get_changes() output to a JSON-friendly dict"""
+    return {
+        "revision": changes["revision"],
+        "reset": changes["reset"],
+        "inserted": [serialize_task(task) for task in changes["inserted"]],
+        "updated": [serialize_task(task) for task in changes["updated"]],
+        "deleted": changes["deleted"]
+    }
+
+
+async def set_task_status(task_id, status):
+    """Persist a task status change"""
+    async with AsyncSessionLocal() as session:
+        await TaskDBHandler(session).update_task_status(task_id, status)
+
+
+def push_step_event(task_id, event):
+    """Push an agent step to the webview as a `task-step` window event"""
+    if api.window is None:
+        return
+    payload = {"task_id": task_id, **event}
+    api.window.evaluate_js(
+        f"window.dispatchEvent(new CustomEvent('task-step', {{ detail: {json.dumps(payload, default=str)} }}))"
+    )
 
-        agent = Agent(
-            task=message,
-            llm=llm2,
-            browser=browser_use_browser2,
-            use_vision=False,
-            max_failures=2,
-            max_actions_per_step=1
-        )
-            
-        # Execute the agent
-        history: AgentHistoryList = await agent.run()
-        result = history.final_result()
 
-        # Log the result
-        log.add_entry(
-            action='run_browser_agent',
-            details={
-                'message': message,
-                'result': result 
-            }
-        )
+async def run_scheduled_task(task):
+    """
+    Run a task once the scheduling policy allows it
 
-        return result  
-      
+    Waits out global captcha backoff and the search engine / target domain
+    rate limits, then runs the browser agent (inline or in the worker pool)
+    and records the outcome.
+    """
+    task_id = task.get('id')
+    try:
+        return await _run_scheduled_task(task, task_id)
     except Exception as e:
+        # Never leave the task in `doing`, get_next_task only picks pending rows
         error_message = str(e)
         log.add_entry(
-            action='run_browser_agent',
+            action='run_scheduled_task',
             details={
-                'message': message,
-                'error': error_message  
+                'task_id': task_id,
+                'error': error_message
             }
         )
+        if task_id is not None:
+            try:
+                await set_task_status(task_id, 'failed')
+            except Exception as status_error:
+                log.add_entry(
+                    action='run_scheduled_task',
+                    details={
+                        'task_id': task_id,
+                        'error': f'could not mark task failed: {status_error}'
+                    }
+                )
         return {
             "status": "error",
             "error": error_message
         }
+    finally:
+        with claimed_task_ids_lock:
+            claimed_task_ids.discard(task_id)
+
+
+async def _run_scheduled_task(task, task_id):
+    while (wait := scheduler.try_acquire(task)) > 0:
+        await asyncio.sleep(min(wait, 30))
+
+    if task_id is not None:
+        await set_task_status(task_id, 'doing')
+
+    on_step = lambda event: push_step_event(task_id, event)
+    if agent_pool:
+        result = await asyncio.get_running_loop().run_in_executor(None, agent_pool.run, task, on_step)
+    else:
+        result = await run_browser_agent_v2(task, log, on_step=on_step)
+
+    # Back off globally when Google (or the target) served a captcha
+    if isinstance(result, dict) and result.get('status') == 'captcha':
+        result['backoff_seconds'] = scheduler.report_captcha(task_id)
+        result['retry'] = scheduler.should_retry(task_id)
+    elif not (isinstance(result, dict) and result.get('status') == 'error'):
+        scheduler.report_success(task_id)
+
+    if task_id is not None:
+        if isinstance(result, dict) and result.get('status') == 'captcha':
+            # Put it back in the queue to run again once the backoff is over, unless its retries are used up
+            status = 'pending' if result['retry'] else 'failed'
+        elif isinstance(result, dict) and result.get('status') == 'error':
+            status = 'failed'
+        else:
+            status = 'completed'
+        await set_task_status(task_id, status)
+
+    return result
 
 
 class Api:
@@ -180,6 +258,9 @@ class Api:
             async_session = AsyncSession(engine)
             handler = TaskDBHandler(async_session)
             
+            # Read the revision first, changes written meanwhile are replayed by the change feed
+            revision = loop.run_until_complete(handler.get_current_revision())
+
             # Get tasks based on parameters
             if status:
                 tasks = loop.run_until_complete(handler.get_tasks_by_status(status))
@@ -193,15 +274,8 @@ class Api:
             # Format response
             return {
                 "status": "success",
-                "tasks": [{
-                    "id": task.id,
-                    "target_website": task.target_website,
-                    "search_keyword": task.search_keyword,
-                    "loop": task.loop,
-                    "status": task.status,
-                    "ordering": task.ordering,
-                    "date_add": task.date_add.isoformat()
-                } for task in tasks]
+                "tasks": [serialize_task(task) for task in tasks],
+                "revision": revision
             }
             
         except Exception as e:
@@ -222,6 +296,101 @@ class Api:
             if async_session:
                 loop.run_until_complete(async_session.close())
 
+    def get_task_changes(self, since_revision=0):
+        """Get tasks inserted, updated or deleted after a revision
+        
+        Args:
+            since_revision (int): Last revision the caller has seen
+            
+        Returns:
+            dict: Response containing the current revision, inserted and updated
+                tasks, and ids of deleted tasks
+        """
+        async_session = None
+        try:
+            # Create event loop if not exists
+            try:
+                loop = asyncio.get_event_loop()
+            except RuntimeError:
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+            
+            # Create database session
+            async_session = AsyncSession(engine)
+            handler = TaskDBHandler(async_session)
+
+            changes = loop.run_until_complete(handler.get_changes(int(since_revision or 0)))
+
+            return {
+                "status": "success",
+                **serialize_changes(changes)
+            }
+        except Exception as e:
+            error_message = str(e)
+            log.add_entry(
+                action='get_task_changes',
+                details={
+                    'error': error_message,
+                    'since_revision': since_revision
+                }
+            )
+            return {
+                "status": "error",
+                "error": error_message
+            }
+        finally:
+            if async_session:
+                loop.run_until_complete(async_session.close())
+
+    def _run_change_feed(self, interval=1.0):
+        """Push task changes to the webview as a `task-changes` window event
+        
+        Polls the revision so writes from any thread or process are picked up,
+        and only sends the rows that changed. Runs until the window is closed.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        async def read_changes(since_revision):
+            async with AsyncSessionLocal() as session:
+                handler = TaskDBHandler(session)
+                if since_revision is None:
+                    return await handler.get_current_revision(), None
+                changes = await handler.get_changes(since_revision)
+                return changes["revision"], changes
+
+        # None until the starting revision is read, which is retried like any poll
+        revision = None
+        failing = False
+        try:
+            while self.window is not None:
+                try:
+                    if revision is None:
+                        revision, _ = loop.run_until_complete(read_changes(None))
+                    else:
+                        current, changes = loop.run_until_complete(read_changes(revision))
+                        if current != revision:
+                            payload = {"since": revision, **serialize_changes(changes)}
+                            self.window.evaluate_js(
+                                f"window.dispatchEvent(new CustomEvent('task-changes', {{ detail: {json.dumps(payload)} }}))"
+                            )
+                            revision = current
+                    failing = False
+                except Exception as e:
+                    # Log once per outage (e.g. a locked DB), not on every poll
+                    if not failing:
+                        log.add_entry(
+                            action='change_feed',
+                            details={
+                                'error': str(e),
+                                'revision': revision
+                            }
+                        )
+                    failing = True
+                time.sleep(interval)
+        finally:
+            loop.close()
+
     def add_task(self, task):
         """Add a task to the database"""
         try:
@@ -244,20 +413,14 @@ class Api:
             task = loop.run_until_complete(handler.create_task(
                 target_website=task.get('target_website'),
                 search_keyword=task.get('search_keyword'),
-                loop=task.get('loop')
+                loop=task.get('loop'),
+                priority=int(task.get('priority') or 0),
+                campaign=task.get('campaign') or None
             ))
 
             return {
                 "status": "success",
-                "task": {
-                    "id": task.id,
-                    "target_website": task.target_website,
-                    "search_keyword": task.search_keyword,
-                    "loop": task.loop,
-                    "status": task.status,
-                    "ordering": task.ordering,
-                    "date_add": task.date_add.isoformat()
-                }
+                "task": serialize_task(task)
             }
         except Exception as e:
             error_message = str(e)
@@ -337,14 +500,7 @@ class Api:
 
             return {
                 "status": "success",
-                "task": {
-                    "id": task.id,
-                    "target_website": task.target_website,
-                    "search_keyword": task.search_keyword,
-                    "loop": task.loop,
-                    "status": task.status,
-                    "ordering": task.ordering,
-                }
+                "task": serialize_task(task)
             }
         except Exception as e:
             error_message = str(e)
@@ -363,6 +519,64 @@ class Api:
             if async_session:
                 loop.run_until_complete(async_session.close())
     
+    def get_execution_settings(self):
+        """Get how agents are executed and how many tasks may run at once"""
+        return {
+            "status": "success",
+            "mode": "process" if agent_pool else "inline",
+            "concurrency": agent_pool.size if agent_pool else 1
+        }
+
+    def get_next_task(self):
+        """Get the next pending task chosen by the scheduling policy
+        
+        Returns:
+            dict: Response containing the task (None when the queue is empty)
+                and the seconds to wait before it may start. The task is claimed
+                until task_reception finishes it, so parallel callers get different tasks
+        """
+        async_session = None
+        try:
+            # Create event loop if not exists
+            try:
+                loop = asyncio.get_event_loop()
+            except RuntimeError:
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+            
+            # Create database session
+            async_session = AsyncSession(engine)
+            handler = TaskDBHandler(async_session)
+
+            tasks = loop.run_until_complete(handler.get_tasks_by_status('pending'))
+            with claimed_task_ids_lock:
+                task, wait_seconds = scheduler.next_task([
+                    serialize_task(task) for task in tasks if task.id not in claimed_task_ids
+                ])
+                if task:
+                    claimed_task_ids.add(task['id'])
+
+            return {
+                "status": "success",
+                "task": task,
+                "wait_seconds": wait_seconds
+            }
+        except Exception as e:
+            error_message = str(e)
+            log.add_entry(
+                action='get_next_task',
+                details={
+                    'error': error_message
+                }
+            )
+            return {
+                "status": "error",
+                "error": error_message
+            }
+        finally:
+            if async_session:
+                loop.run_until_complete(async_session.close())
+
     def task_reception(self, task):
         """Task reception - synchronous wrapper for async function"""
         try:
@@ -373,7 +587,7 @@ class Api:
             asyncio.set_event_loop(loop)
         
         try:
-            return loop.run_until_complete(run_browser_agent_v2(task))
+            return loop.run_until_complete(run_scheduled_task(task))
         finally:
             if loop.is_running():
                 loop.close()
@@ -422,9 +636,12 @@ def create_window():
         text_select=True
     )
     api.set_window(window)
+    window.events.closed += lambda: api.set_window(None)
+    if agent_pool:
+        window.events.closed += agent_pool.shutdown
     
-    # Start the application with debug enabled
-    pywebview.start(debug=True)
+    # Start the application with debug enabled, pushing task changes from a background thread
+    pywebview.start(api._run_change_feed, debug=True)
 
 if __name__ == "__main__":
     create_window()  
\ No newline at end of file
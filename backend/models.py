@@ -11,4 +11,17 @@ class Task(Base):
     loop = Column(Integer, default=1)
     status = Column(String, default="pending")  # pending, running, completed, failed
     ordering = Column(Integer, default=0)
-    date_add = Column(DateTime(timezone=True), server_default=func.now()) 
\ No newline at end of file
+    priority = Column(Integer, default=0)  # higher runs first
+    campaign = Column(String, nullable=True)  # fair-share group, defaults to target domain
+    revision = Column(Integer, default=0, index=True)  # revision of the last write
+    date_add = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TaskRevision(Base):
+    """Monotonic revision sequence, one row per write to the tasks table"""
+    __tablename__ = "task_revisions"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)  # the revision number
+    task_id = Column(Integer, nullable=False, index=True)
+    operation = Column(String, nullable=False)  # insert, update, delete
@@ -0,0 +1,160 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Optional
+from urllib.parse import urlparse
+
+from browser_use.browser.context import BrowserContext
+
+
+# Resource types the SERP-and-visit flow never needs
+DEFAULT_BLOCKED_RESOURCE_TYPES = frozenset({
+    "image",
+    "media",
+    "font",
+})
+
+# Ad networks and trackers loaded by Google results and most landing pages
+DEFAULT_BLOCKED_DOMAINS = frozenset({
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "adservice.google.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "scorecardresearch.com",
+    "adnxs.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+})
+
+# Rough average transfer size per resource type, used to estimate bytes saved
+# for requests that are aborted before any response exists
+ESTIMATED_BYTES_BY_RESOURCE_TYPE = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "stylesheet": 20_000,
+    "script": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+ESTIMATED_BYTES_DEFAULT = 10_000
+
+
+def _host_matches(host: str, domains: FrozenSet[str]) -> bool:
+    """Check whether host equals or is a subdomain of any domain in the set"""
+    host = host.lower().rstrip(".")
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def _host_of(url: str) -> str:
+    """Return the hostname of a URL, accepting bare domains like example.com"""
+    if "://" not in url:
+        url = f"http://{url}"
+    host = urlparse(url).hostname or ""
+    return host.lower()
+
+
+@dataclass
+class NetworkStats:
+    """Blocked-request counters collected for a single task"""
+    blocked_requests: int = 0
+    allowed_requests: int = 0
+    estimated_bytes_saved: int = 0
+    blocked_by_type: Dict[str, int] = field(default_factory=dict)
+
+    def record_blocked(self, resource_type: str) -> None:
+        self.blocked_requests += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        self.estimated_bytes_saved += ESTIMATED_BYTES_BY_RESOURCE_TYPE.get(
+            resource_type, ESTIMATED_BYTES_DEFAULT
+        )
+
+    def record_allowed(self) -> None:
+        self.allowed_requests += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "blocked_requests": self.blocked_requests,
+            "allowed_requests": self.allowed_requests,
+            "estimated_bytes_saved": self.estimated_bytes_saved,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
+
+
+@dataclass(frozen=True)
+class NetworkProfile:
+    """
+    Request-interception profile applied to agent browser contexts.
+
+    Requests are aborted when their resource type is in `blocked_resource_types`
+    or their host is in `blocked_domains`. Hosts in `allowed_domains` are never
+    blocked, so the target site's own page loads in full for the visit.
+    Main-frame navigations never reach the profile (see BlockingBrowserContext),
+    so navigation never breaks. Iframe documents still go through the domain
+    blocklist, which keeps ad iframes out.
+    """
+    enabled: bool = True
+    blocked_resource_types: FrozenSet[str] = DEFAULT_BLOCKED_RESOURCE_TYPES
+    blocked_domains: FrozenSet[str] = DEFAULT_BLOCKED_DOMAINS
+    allowed_domains: FrozenSet[str] = frozenset()
+
+    def for_target(self, target_website: Optional[str]) -> "NetworkProfile":
+        """Return a copy of the profile with the target site's domain allowlisted"""
+        if not target_website:
+            return self
+        host = _host_of(target_website)
+        if not host:
+            return self
+        # Allow both the bare domain and its www. variant
+        bare = host[4:] if host.startswith("www.") else host
+        return NetworkProfile(
+            enabled=self.enabled,
+            blocked_resource_types=self.blocked_resource_types,
+            blocked_domains=self.blocked_domains,
+            allowed_domains=self.allowed_domains | {bare},
+        )
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """Decide whether a request should be aborted"""
+        if not self.enabled:
+            return False
+        host = _host_of(url)
+        if not host:
+            return False
+        if _host_matches(host, self.allowed_domains):
+            return False
+        if resource_type in self.blocked_resource_types:
+            return True
+        return _host_matches(host, self.blocked_domains)
+
+
+class BlockingBrowserContext(BrowserContext):
+    """BrowserContext that routes every request through a NetworkProfile"""
+
+    def __init__(self, *args, network_profile: NetworkProfile, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.network_profile = network_profile
+        self.network_stats = NetworkStats()
+
+    async def _create_context(self, browser):
+        context = await super()._create_context(browser)
+        if self.network_profile.enabled:
+            await context.route("**/*", self._handle_route)
+        return context
+
+    async def _handle_route(self, route) -> None:
+        request = route.request
+        # Top-level navigations always load, iframe documents are checked like any request
+        is_main_frame_navigation = request.is_navigation_request() and request.frame.parent_frame is None
+        if not is_main_frame_navigation and self.network_profile.should_block(request.url, request.resource_type):
+            self.network_stats.record_blocked(request.resource_type)
+            await route.abort("blockedbyclient")
+        else:
+            self.network_stats.record_allowed()
+            await route.continue_()
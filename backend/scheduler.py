@@ -0,0 +1,252 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+# Markers of captcha / "unusual traffic" interstitials. Only page URLs and
+# titles are matched, never the LLM's free-text summary, which may mention
+# captchas without having hit one.
+CAPTCHA_URL_MARKERS = (
+    "google.com/sorry",
+    "/recaptcha/",
+    "challenges.cloudflare.com",
+)
+CAPTCHA_TITLE_MARKERS = (
+    "unusual traffic",
+    "just a moment...",
+    "attention required! | cloudflare",
+)
+
+
+def is_captcha_page(urls: Iterable[Optional[str]] = (), titles: Iterable[Optional[str]] = ()) -> bool:
+    """Check visited page URLs and titles for captcha markers"""
+    for url in urls:
+        if url and any(marker in url.lower() for marker in CAPTCHA_URL_MARKERS):
+            return True
+    for title in titles:
+        if title and any(marker in title.lower() for marker in CAPTCHA_TITLE_MARKERS):
+            return True
+    return False
+
+
+def domain_of(url: Optional[str]) -> str:
+    """Return the hostname of a URL without www., accepting bare domains"""
+    if not url:
+        return ""
+    if "://" not in url:
+        url = f"http://{url}"
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter.
+
+    Holds up to `capacity` tokens and refills at `rate_per_hour`, so short
+    bursts are allowed while the sustained rate stays capped.
+    """
+
+    def __init__(self, rate_per_hour: float, capacity: int):
+        self.rate = rate_per_hour / 3600.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Seconds until one token is available"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self.tokens -= 1
+
+
+@dataclass
+class RateLimitConfig:
+    """Rate limits and backoff settings for the scheduling policy"""
+    engine_rate_per_hour: float = 30
+    engine_burst: int = 2
+    domain_rate_per_hour: float = 60
+    domain_burst: int = 3
+    captcha_backoff_seconds: float = 300
+    captcha_backoff_max_seconds: float = 3600
+    max_captcha_retries: int = 3
+
+
+class SchedulingPolicy:
+    """
+    Decides which pending task runs next and when.
+
+    - Tasks are grouped by priority (highest first). Within a priority the
+      queue is interleaved across campaigns, and within a campaign across
+      target domains, so no single campaign or domain hogs the run. The
+      rotation survives between picks: campaigns and domains are ranked by
+      when they were last served (in `try_acquire`), least recent first.
+    - Each search engine and each target domain has its own token bucket.
+    - A detected captcha puts the whole scheduler into exponential backoff,
+      reset by the next clean run. Each task is retried after a captcha at
+      most `max_captcha_retries` times.
+
+    Methods are thread-safe since pywebview calls the API from worker threads.
+    """
+
+    def __init__(self, config: Optional[RateLimitConfig] = None):
+        self.config = config or RateLimitConfig()
+        self.engine_buckets: Dict[str, TokenBucket] = {}
+        self.domain_buckets: Dict[str, TokenBucket] = {}
+        self.backoff_until = 0.0
+        self.captcha_strikes = 0
+        self.captcha_retries: Dict[Any, int] = {}
+        # Fair-share rotation state: sequence number of the last pick per campaign / domain
+        self.serve_seq = 0
+        self.campaign_served: Dict[str, int] = {}
+        self.domain_served: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def engine_of(task: Dict[str, Any]) -> str:
+        return task.get("search_engine") or "google"
+
+    @staticmethod
+    def campaign_of(task: Dict[str, Any]) -> str:
+        return task.get("campaign") or domain_of(task.get("target_website"))
+
+    def _engine_bucket(self, engine: str) -> TokenBucket:
+        if engine not in self.engine_buckets:
+            self.engine_buckets[engine] = TokenBucket(
+                self.config.engine_rate_per_hour, self.config.engine_burst
+            )
+        return self.engine_buckets[engine]
+
+    def _domain_bucket(self, domain: str) -> TokenBucket:
+        if domain not in self.domain_buckets:
+            self.domain_buckets[domain] = TokenBucket(
+                self.config.domain_rate_per_hour, self.config.domain_burst
+            )
+        return self.domain_buckets[domain]
+
+    def order(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Order tasks by priority, then fair-share across campaigns and domains"""
+        by_priority: Dict[int, List[Dict[str, Any]]] = {}
+        for task in sorted(tasks, key=lambda t: (t.get("ordering") or 0, t.get("date_add") or "")):
+            by_priority.setdefault(task.get("priority") or 0, []).append(task)
+
+        ordered = []
+        for priority in sorted(by_priority, reverse=True):
+            # campaign -> domain -> queue of tasks, preserving first-seen order
+            campaigns: "OrderedDict[str, OrderedDict[str, deque]]" = OrderedDict()
+            for task in by_priority[priority]:
+                domains = campaigns.setdefault(self.campaign_of(task), OrderedDict())
+                domains.setdefault(domain_of(task.get("target_website")), deque()).append(task)
+
+            # Least recently served first, never served ones keep first-seen order
+            campaign_queues = deque(
+                self._round_robin(campaign, campaigns[campaign])
+                for campaign in sorted(campaigns, key=lambda c: self.campaign_served.get(c, 0))
+            )
+            while campaign_queues:
+                queue = campaign_queues.popleft()
+                task = next(queue, None)
+                if task is not None:
+                    ordered.append(task)
+                    campaign_queues.append(queue)
+        return ordered
+
+    def _round_robin(self, campaign: str, domains: "OrderedDict[str, deque]"):
+        queues = deque(
+            domains[domain]
+            for domain in sorted(domains, key=lambda d: self.domain_served.get((campaign, d), 0))
+        )
+        while queues:
+            queue = queues.popleft()
+            yield queue.popleft()
+            if queue:
+                queues.append(queue)
+
+    def wait_time(self, task: Dict[str, Any], now: Optional[float] = None) -> float:
+        """Seconds until the task may start under backoff and rate limits"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return max(
+                self.backoff_until - now,
+                self._engine_bucket(self.engine_of(task)).wait_time(now),
+                self._domain_bucket(domain_of(task.get("target_website"))).wait_time(now),
+                0.0,
+            )
+
+    def next_task(self, tasks: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Pick the next task to run.
+
+        Returns the first task in fair-share order that can start now, otherwise
+        the one that becomes available soonest, together with its wait time.
+        """
+        now = time.monotonic()
+        best, best_wait = None, 0.0
+        for task in self.order(tasks):
+            wait = self.wait_time(task, now)
+            if wait == 0:
+                return task, 0.0
+            if best is None or wait < best_wait:
+                best, best_wait = task, wait
+        return best, best_wait
+
+    def try_acquire(self, task: Dict[str, Any]) -> float:
+        """Take the tokens for a task. Returns 0 on success, otherwise seconds to wait"""
+        now = time.monotonic()
+        with self._lock:
+            engine_bucket = self._engine_bucket(self.engine_of(task))
+            domain_bucket = self._domain_bucket(domain_of(task.get("target_website")))
+            wait = max(
+                self.backoff_until - now,
+                engine_bucket.wait_time(now),
+                domain_bucket.wait_time(now),
+                0.0,
+            )
+            if wait == 0:
+                engine_bucket.consume(now)
+                domain_bucket.consume(now)
+                self.serve_seq += 1
+                campaign = self.campaign_of(task)
+                self.campaign_served[campaign] = self.serve_seq
+                self.domain_served[(campaign, domain_of(task.get("target_website")))] = self.serve_seq
+            return wait
+
+    def report_captcha(self, task_id: Any = None) -> float:
+        """Enter exponential global backoff. Returns the backoff length in seconds"""
+        with self._lock:
+            if task_id is not None:
+                self.captcha_retries[task_id] = self.captcha_retries.get(task_id, 0) + 1
+            self.captcha_strikes += 1
+            backoff = min(
+                self.config.captcha_backoff_seconds * 2 ** (self.captcha_strikes - 1),
+                self.config.captcha_backoff_max_seconds,
+            )
+            self.backoff_until = time.monotonic() + backoff
+            return backoff
+
+    def should_retry(self, task_id: Any) -> bool:
+        """Whether a task that hit a captcha goes back to the queue, False once its retries are used up"""
+        with self._lock:
+            if self.captcha_retries.get(task_id, 0) <= self.config.max_captcha_retries:
+                return True
+            self.captcha_retries.pop(task_id, None)
+            return False
+
+    def report_success(self, task_id: Any = None) -> None:
+        with self._lock:
+            self.captcha_strikes = 0
+            self.captcha_retries.pop(task_id, None)
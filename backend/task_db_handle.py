@@ -1,21 +1,51 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
-from models import Task
-from typing import List, Optional
+from sqlalchemy import select, update, delete, func
+from models import Task, TaskRevision
+from typing import Any, Dict, List, Optional
+
+# Insert/delete revision rows are kept for this many revisions. Clients further
+# behind get a reset and reload the full list.
+KEEP_REVISIONS = 10000
+# Prune old revision rows once every this many revisions
+PRUNE_EVERY = 1000
 
 class TaskDBHandler:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def create_task(self, target_website: str, search_keyword: str, loop: int = 1, status: str = "pending") -> Task:
+    async def _next_revision(self, task_id: int, operation: str) -> int:
+        """Allocate the next revision number for a write (flushed, not committed)
+
+        Update rows are dropped right away, the revision stored on the task
+        covers them and AUTOINCREMENT never hands out the number again. Only
+        insert and delete rows are kept, and those are pruned periodically.
+        """
+        revision = TaskRevision(task_id=task_id, operation=operation)
+        self.db.add(revision)
+        await self.db.flush()
+        revision_id = revision.id
+        if operation == "update":
+            await self.db.delete(revision)
+        if revision_id % PRUNE_EVERY == 0:
+            await self.db.execute(
+                delete(TaskRevision).where(TaskRevision.id <= revision_id - KEEP_REVISIONS)
+            )
+        return revision_id
+
+    async def create_task(self, target_website: str, search_keyword: str, loop: int = 1, status: str = "pending",
+                          priority: int = 0, campaign: Optional[str] = None) -> Task:
         """Create a new task"""
         task = Task(
             target_website=target_website,
             search_keyword=search_keyword,
             loop=loop,
-            status=status
+            status=status,
+            priority=priority,
+            campaign=campaign
         )
         self.db.add(task)
+        await self.db.flush()
+        task.revision = await self._next_revision(task.id, "insert")
         await self.db.commit()
         await self.db.refresh(task)
         return task
@@ -43,17 +73,29 @@ class TaskDBHandler:
         task = await self.get_task(task_id)
         if task:
             task.status = status
+            task.revision = await self._next_revision(task.id, "update")
             await self.db.commit()
             await self.db.refresh(task)
         return task
 
+    async def requeue_interrupted_tasks(self) -> List[Task]:
+        """Put tasks left in `doing` by an interrupted run back to pending"""
+        tasks = await self.get_tasks_by_status("doing")
+        for task in tasks:
+            task.status = "pending"
+            task.revision = await self._next_revision(task.id, "update")
+        if tasks:
+            await self.db.commit()
+        return tasks
+
     async def update_task(self, task_id: int, **kwargs) -> Optional[Task]:
         """Update task fields"""
         task = await self.get_task(task_id)
         if task:
             for key, value in kwargs.items():
-                if hasattr(task, key):
+                if key not in ("id", "revision") and hasattr(task, key):
                     setattr(task, key, value)
+            task.revision = await self._next_revision(task.id, "update")
             await self.db.commit()
             await self.db.refresh(task)
         return task
@@ -62,6 +104,7 @@ class TaskDBHandler:
         """Delete a task"""
         task = await self.get_task(task_id)
         if task:
+            await self._next_revision(task.id, "delete")
             await self.db.delete(task)
             await self.db.commit()
             return True
@@ -78,3 +121,48 @@ class TaskDBHandler:
         ).order_by(Task.ordering, Task.date_add)
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
+
+    async def get_current_revision(self) -> int:
+        """Get the latest revision number, 0 when nothing was written yet"""
+        # The latest revision lives either on a task row or on an insert/delete row
+        result = await self.db.execute(select(func.max(Task.revision)))
+        task_revision = result.scalar() or 0
+        result = await self.db.execute(select(func.max(TaskRevision.id)))
+        return max(task_revision, result.scalar() or 0)
+
+    async def get_changes(self, since_revision: int) -> Dict[str, Any]:
+        """Get tasks inserted, updated or deleted after a revision
+
+        `reset` is True when `since_revision` is older than the kept revision
+        rows. Deletes may be missing then, so the caller must reload the full list.
+        """
+        revision = await self.get_current_revision()
+        if since_revision < revision - KEEP_REVISIONS:
+            return {"revision": revision, "reset": True, "inserted": [], "updated": [], "deleted": []}
+
+        query = select(Task).where(
+            Task.revision > since_revision, Task.revision <= revision
+        ).order_by(Task.revision)
+        result = await self.db.execute(query)
+        tasks = list(result.scalars().all())
+
+        query = select(TaskRevision.task_id, TaskRevision.operation).where(
+            TaskRevision.id > since_revision,
+            TaskRevision.id <= revision,
+            TaskRevision.operation.in_(("insert", "delete"))
+        )
+        result = await self.db.execute(query)
+        operations = result.all()
+        inserted_ids = {task_id for task_id, operation in operations if operation == "insert"}
+        current_ids = {task.id for task in tasks}
+
+        return {
+            "revision": revision,
+            "reset": False,
+            "inserted": [task for task in tasks if task.id in inserted_ids],
+            "updated": [task for task in tasks if task.id not in inserted_ids],
+            "deleted": sorted({
+                task_id for task_id, operation in operations
+                if operation == "delete" and task_id not in current_ids
+            })
+        }
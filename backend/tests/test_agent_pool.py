@@ -0,0 +1,159 @@
+import io
+import os
+import shutil
+import time
+
+import pytest
+
+import agent_pool
+from agent_pool import AgentPool, WorkerError, read_frame, write_frame
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stands in for agent_runner in the worker, behaviour picked by task["mode"]
+STUB_AGENT_RUNNER = '''
+import os
+import subprocess
+import sys
+import time
+
+
+async def run_browser_agent_v2(task, log, on_step=None):
+    mode = task.get("mode", "ok")
+    if mode == "crash":
+        os._exit(3)
+    if mode == "hang":
+        time.sleep(60)
+    if mode == "orphan":
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        on_step({"step": 1, "child": child.pid})
+        os._exit(3)
+    log.add_entry(action="stub_run", details={"name": task.get("name")}, category="test")
+    for step in (1, 2):
+        on_step({"step": step, "name": task.get("name")})
+    return {"status": "success", "pid": os.getpid(), "name": task.get("name")}
+'''
+
+
+class ListLog:
+    def __init__(self):
+        self.entries = []
+
+    def add_entry(self, action, details, category="general"):
+        self.entries.append((action, details, category))
+
+
+@pytest.fixture
+def make_pool(tmp_path, monkeypatch):
+    """Pool whose workers import a stub agent_runner from tmp_path"""
+    shutil.copy(os.path.join(BACKEND_DIR, "agent_pool.py"), tmp_path)
+    shutil.copy(os.path.join(BACKEND_DIR, "agent_worker.py"), tmp_path)
+    (tmp_path / "agent_runner.py").write_text(STUB_AGENT_RUNNER)
+    monkeypatch.setattr(agent_pool, "WORKER_SCRIPT", str(tmp_path / "agent_worker.py"))
+
+    pools = []
+
+    def make(**kwargs):
+        kwargs.setdefault("max_rss_mb", 0)
+        pool = AgentPool(ListLog(), **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def is_running(pid):
+    """False once pid is gone or a zombie (orphans may not be reaped here)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_frame_round_trip():
+    stream = io.BytesIO()
+    messages = [{"t": "run", "id": 1, "task": {"name": "ünïcode"}}, {"t": "stop"}]
+    for message in messages:
+        write_frame(stream, message)
+    stream.seek(0)
+    assert [read_frame(stream), read_frame(stream)] == messages
+    assert read_frame(stream) is None
+
+
+def test_truncated_frame_reads_as_eof():
+    stream = io.BytesIO()
+    write_frame(stream, {"t": "result", "id": 1, "r": "x" * 100})
+    data = stream.getvalue()
+    assert read_frame(io.BytesIO(data[:2])) is None
+    assert read_frame(io.BytesIO(data[:-10])) is None
+
+
+def test_runs_task_and_forwards_steps_and_logs(make_pool):
+    pool = make_pool(size=1)
+    steps = []
+    result = pool.run({"name": "a"}, on_step=steps.append)
+    assert result["status"] == "success"
+    assert steps == [{"step": 1, "name": "a"}, {"step": 2, "name": "a"}]
+    assert ("stub_run", {"name": "a"}, "test") in pool.log.entries
+
+
+def test_recycles_after_max_tasks(make_pool):
+    pool = make_pool(size=1, max_tasks_per_worker=2)
+    pids = [pool.run({"name": str(i)})["pid"] for i in range(4)]
+    assert pids[0] == pids[1] != pids[2] == pids[3]
+    reasons = [d["reason"] for a, d, c in pool.log.entries if a == "agent_pool_recycle"]
+    assert reasons == ["max_tasks", "max_tasks"]
+
+
+def test_replaces_crashed_worker(make_pool):
+    pool = make_pool(size=1)
+    first = pool.run({"name": "a"})["pid"]
+    result = pool.run({"mode": "crash"})
+    assert result["status"] == "error"
+    assert "exited with code 3" in result["error"]
+    assert pool.run({"name": "b"})["pid"] != first
+
+
+def test_replaces_hung_worker_after_timeout(make_pool):
+    pool = make_pool(size=1, task_timeout=1)
+    first = pool.run({"name": "a"})["pid"]
+    started = time.monotonic()
+    result = pool.run({"mode": "hang"})
+    assert time.monotonic() - started < 10
+    assert result["status"] == "error"
+    assert "timed out" in result["error"]
+    assert not is_running(first)
+    assert pool.run({"name": "b"})["pid"] != first
+
+
+def test_on_step_error_replaces_busy_worker(make_pool):
+    pool = make_pool(size=1)
+
+    def failing_step(event):
+        raise RuntimeError("webview gone")
+
+    first = pool.run({"name": "a"})["pid"]
+    with pytest.raises(RuntimeError):
+        pool.run({"name": "b"}, on_step=failing_step)
+
+    # The next task gets a fresh worker and none of the interrupted job's frames
+    steps = []
+    result = pool.run({"name": "c"}, on_step=steps.append)
+    assert result["pid"] != first
+    assert result["name"] == "c"
+    assert steps == [{"step": 1, "name": "c"}, {"step": 2, "name": "c"}]
+
+
+def test_kills_descendants_of_dead_worker(make_pool):
+    pool = make_pool(size=1)
+    steps = []
+    result = pool.run({"mode": "orphan"}, on_step=steps.append)
+    assert result["status"] == "error"
+    child = steps[0]["child"]
+    deadline = time.monotonic() + 5
+    while is_running(child) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not is_running(child)
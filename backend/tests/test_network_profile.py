@@ -0,0 +1,109 @@
+import asyncio
+
+from browser_use import Browser, BrowserConfig
+
+from network_profile import BlockingBrowserContext, NetworkProfile, _host_matches
+
+AD_IFRAME = "https://googleads.g.doubleclick.net/pagead/ads?client=1"
+
+
+class FakeFrame:
+    def __init__(self, parent_frame=None):
+        self.parent_frame = parent_frame
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type, navigation=False, frame=None):
+        self.url = url
+        self.resource_type = resource_type
+        self.navigation = navigation
+        self.frame = frame or FakeFrame()
+
+    def is_navigation_request(self):
+        return self.navigation
+
+
+class FakeRoute:
+    def __init__(self, request):
+        self.request = request
+        self.outcome = None
+
+    async def abort(self, error_code=None):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+def handle(request):
+    browser = Browser(config=BrowserConfig(headless=True))
+    context = BlockingBrowserContext(
+        browser=browser,
+        config=browser.config.new_context_config,
+        network_profile=NetworkProfile(),
+    )
+    route = FakeRoute(request)
+    asyncio.run(context._handle_route(route))
+    return route.outcome, context.network_stats
+
+
+def test_host_matches_exact_and_subdomains_only():
+    domains = frozenset({"doubleclick.net"})
+    assert _host_matches("doubleclick.net", domains)
+    assert _host_matches("googleads.g.doubleclick.net", domains)
+    assert _host_matches("DoubleClick.net.", domains)
+    assert not _host_matches("notdoubleclick.net", domains)
+
+
+def test_blocks_by_resource_type_and_domain():
+    profile = NetworkProfile()
+    assert profile.should_block("https://www.google.com/logo.png", "image")
+    assert profile.should_block("https://www.googletagmanager.com/gtm.js", "script")
+    assert not profile.should_block("https://www.google.com/search?q=x", "script")
+
+
+def test_target_allowlist_beats_type_and_domain_blocks():
+    profile = NetworkProfile(blocked_domains=frozenset({"example.com"})).for_target("https://example.com")
+    assert not profile.should_block("https://example.com/hero.jpg", "image")
+    assert not profile.should_block("https://example.com/app.js", "script")
+
+
+def test_for_target_matches_www_and_subdomains():
+    profile = NetworkProfile().for_target("https://www.fleetcard.com.au/page")
+    assert profile.allowed_domains == frozenset({"fleetcard.com.au"})
+    assert not profile.should_block("https://fleetcard.com.au/logo.png", "image")
+    assert not profile.should_block("https://www.fleetcard.com.au/logo.png", "image")
+    assert not profile.should_block("https://cdn.fleetcard.com.au/font.woff2", "font")
+
+
+def test_for_target_accepts_bare_domains():
+    profile = NetworkProfile().for_target("fleetcard.com.au")
+    assert profile.allowed_domains == frozenset({"fleetcard.com.au"})
+    assert not profile.should_block("https://fleetcard.com.au/logo.png", "image")
+    assert not profile.should_block("fleetcard.com.au/logo.png", "image")
+    assert NetworkProfile().for_target(None) == NetworkProfile()
+
+
+def test_disabled_profile_blocks_nothing():
+    profile = NetworkProfile(enabled=False)
+    assert not profile.should_block("https://www.google.com/logo.png", "image")
+    assert not profile.should_block(AD_IFRAME, "document")
+
+
+def test_blocklisted_subframe_document_is_aborted():
+    outcome, stats = handle(FakeRequest(AD_IFRAME, "document", navigation=True, frame=FakeFrame(FakeFrame())))
+    assert outcome == "aborted"
+    assert stats.blocked_by_type == {"document": 1}
+
+
+def test_main_frame_navigation_always_loads():
+    outcome, stats = handle(FakeRequest(AD_IFRAME, "document", navigation=True))
+    assert outcome == "continued"
+    assert stats.blocked_requests == 0
+    assert stats.allowed_requests == 1
+
+
+def test_blocked_requests_count_estimated_bytes():
+    outcome, stats = handle(FakeRequest("https://www.google.com/logo.png", "image"))
+    assert outcome == "aborted"
+    assert stats.to_dict()["estimated_bytes_saved"] > 0
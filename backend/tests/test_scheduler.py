@@ -0,0 +1,69 @@
+from scheduler import RateLimitConfig, SchedulingPolicy, is_captcha_page
+
+
+def unlimited_policy():
+    return SchedulingPolicy(RateLimitConfig(
+        engine_rate_per_hour=1e9, engine_burst=1000,
+        domain_rate_per_hour=1e9, domain_burst=1000,
+    ))
+
+
+def make_tasks(*specs):
+    return [
+        {"id": i, "target_website": website, "campaign": campaign, "priority": priority,
+         "ordering": 0, "date_add": f"2025-01-01T00:00:{i:02d}"}
+        for i, (website, campaign, priority) in enumerate(specs)
+    ]
+
+
+def run_all(policy, tasks):
+    """Pick, acquire and remove tasks one at a time, like repeated get_next_task() calls"""
+    pending = list(tasks)
+    picked = []
+    while pending:
+        task, wait = policy.next_task(pending)
+        assert wait == 0
+        assert policy.try_acquire(task) == 0
+        pending.remove(task)
+        picked.append(task)
+    return picked
+
+
+def test_repeated_picks_interleave_domains():
+    tasks = make_tasks(*[("a.com", None, 0)] * 3, *[("b.com", None, 0)] * 3)
+    picked = run_all(unlimited_policy(), tasks)
+    assert [t["target_website"] for t in picked] == ["a.com", "b.com"] * 3
+
+
+def test_repeated_picks_interleave_campaigns_then_domains():
+    tasks = make_tasks(
+        ("a.com", "x", 0), ("a.com", "x", 0), ("b.com", "x", 0), ("b.com", "x", 0),
+        ("c.com", "y", 0), ("c.com", "y", 0),
+    )
+    picked = run_all(unlimited_policy(), tasks)
+    assert [(t["campaign"], t["target_website"]) for t in picked] == [
+        ("x", "a.com"), ("y", "c.com"), ("x", "b.com"),
+        ("y", "c.com"), ("x", "a.com"), ("x", "b.com"),
+    ]
+
+
+def test_higher_priority_runs_first():
+    tasks = make_tasks(("a.com", None, 0), ("b.com", None, 5), ("a.com", None, 5))
+    picked = run_all(unlimited_policy(), tasks)
+    assert [t["id"] for t in picked] == [1, 2, 0]
+
+
+def test_captcha_detected_from_urls_and_titles_only():
+    assert is_captcha_page(urls=["https://www.google.com/sorry/index?continue=x"])
+    assert is_captcha_page(titles=["Just a moment..."])
+    assert not is_captcha_page(urls=["https://example.com/"], titles=["Visited example.com, no captcha shown"])
+
+
+def test_captcha_retries_are_capped_per_task():
+    policy = SchedulingPolicy(RateLimitConfig(max_captcha_retries=2))
+    retries = []
+    for _ in range(3):
+        policy.report_captcha(task_id=7)
+        retries.append(policy.should_retry(7))
+    assert retries == [True, True, False]
+    assert policy.should_retry(8)
@@ -0,0 +1,73 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import task_db_handle
+from database import Base
+from models import TaskRevision
+from task_db_handle import TaskDBHandler
+
+
+async def with_handler(test):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await test(TaskDBHandler(session), session)
+    await engine.dispose()
+
+
+def test_changes_report_inserted_updated_and_deleted_rows():
+    async def test(handler, session):
+        kept = await handler.create_task("a.com", "kw")
+        removed = await handler.create_task("b.com", "kw")
+        since = await handler.get_current_revision()
+
+        new = await handler.create_task("c.com", "kw")
+        await handler.update_task_status(kept.id, "doing")
+        await handler.delete_task(removed.id)
+
+        changes = await handler.get_changes(since)
+        assert changes["reset"] is False
+        assert [task.id for task in changes["inserted"]] == [new.id]
+        assert [task.id for task in changes["updated"]] == [kept.id]
+        assert changes["deleted"] == [removed.id]
+        assert changes["revision"] == await handler.get_current_revision()
+
+    asyncio.run(with_handler(test))
+
+
+def test_revision_rows_stay_bounded(monkeypatch):
+    monkeypatch.setattr(task_db_handle, "KEEP_REVISIONS", 5)
+    monkeypatch.setattr(task_db_handle, "PRUNE_EVERY", 4)
+
+    async def test(handler, session):
+        task = await handler.create_task("a.com", "kw")
+        for _ in range(20):
+            await handler.update_task_status(task.id, "doing")
+
+        result = await session.execute(select(TaskRevision.operation))
+        assert result.scalars().all() == []  # update rows dropped, insert row pruned
+        assert await handler.get_current_revision() == 21
+        assert (await handler.get_changes(0))["reset"] is True
+        assert (await handler.get_changes(16))["reset"] is False
+
+    asyncio.run(with_handler(test))
+
+
+def test_requeue_interrupted_tasks_resets_doing_to_pending():
+    async def test(handler, session):
+        running = await handler.create_task("a.com", "kw", status="doing")
+        done = await handler.create_task("b.com", "kw", status="completed")
+        since = await handler.get_current_revision()
+
+        requeued = await handler.requeue_interrupted_tasks()
+
+        assert [task.id for task in requeued] == [running.id]
+        assert (await handler.get_task(running.id)).status == "pending"
+        assert (await handler.get_task(done.id)).status == "completed"
+        changes = await handler.get_changes(since)
+        assert [task.id for task in changes["updated"]] == [running.id]
+
+    asyncio.run(with_handler(test))
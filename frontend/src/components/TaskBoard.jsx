@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import TaskList from './TaskList';
 
 const initialTasks = [
@@ -20,16 +20,53 @@ const initialTasks = [
 
 export default function TaskBoard() {
   const [tasks, setTasks] = useState([]);
+  // last task revision applied to the list
+  const revisionRef = useRef(0);
 
   // get tasks from backend
   const getTasks = async () => {
     const result = await window.pywebview.api.get_tasks()
     console.log('___Get tasks result:', typeof result.tasks)
     setTasks([...result.tasks])
+    revisionRef.current = result.revision || 0
+  }
+
+  // merge inserted, updated and deleted rows into the list instead of reloading it
+  const applyChanges = (changes) => {
+    if (changes.reset) {
+      // too far behind for the kept revisions, reload the full list
+      getTasks()
+      return
+    }
+    const deleted = new Set(changes.deleted)
+    const upserts = new Map([...changes.inserted, ...changes.updated].map(task => [task.id, task]))
+
+    setTasks(prev => {
+      const next = prev
+        .filter(task => !deleted.has(task.id))
+        .map(task => upserts.has(task.id) ? { ...task, ...upserts.get(task.id) } : task)
+      const existing = new Set(next.map(task => task.id))
+      return [...next, ...[...upserts.values()].filter(task => !existing.has(task.id))]
+    })
+    revisionRef.current = changes.revision
+  }
+
+  // pushed by the backend change feed
+  const handleTaskChanges = async (event) => {
+    const changes = event.detail
+    if (changes.since > revisionRef.current) {
+      // missed some revisions, fetch everything since the last one applied
+      const result = await window.pywebview.api.get_task_changes(revisionRef.current)
+      if (result.status === 'success') applyChanges(result)
+      return
+    }
+    if (changes.revision > revisionRef.current) applyChanges(changes)
   }
 
   useEffect(() => {
     getTasks()
+    window.addEventListener('task-changes', handleTaskChanges)
+    return () => window.removeEventListener('task-changes', handleTaskChanges)
   }, [])
 
   const handleTaskUpdate = (updatedTasks) => {
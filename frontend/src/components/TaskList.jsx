@@ -4,7 +4,7 @@ import { SortableContext, verticalListSortingStrategy, useSortable } from '@dnd-
 import { CSS } from '@dnd-kit/utilities';
 import { Edit, Trash2, GripVertical, Plus, Play, Loader2 } from 'lucide-react';
 
-const SortableItem = ({ numIndex, task, onEdit, onDelete }) => {
+const SortableItem = ({ numIndex, task, step, onEdit, onDelete }) => {
   const { attributes, listeners, setNodeRef, transform, transition } = useSortable({ id: task.id });
   
   const style = {
@@ -37,6 +37,11 @@ const SortableItem = ({ numIndex, task, onEdit, onDelete }) => {
         <span className={`px-2 py-1 rounded-full text-xs font-medium ${statusColors[task.status]}`}>
           {task.status}
         </span>
+        {task.status === 'doing' && step && (
+          <div className="mt-1 text-xs text-gray-500 max-w-xs truncate" title={step.url}>
+            Step {step.step}{step.url ? ` · ${step.url}` : ''}
+          </div>
+        )}
       </td>
       {/* <td className="p-3">{task.loop}</td> */}
       <td className="p-3">
@@ -58,12 +63,14 @@ const TaskForm = ({ task, onSave, onCancel }) => {
     target_website: '',
     search_keyword: '',
     status: 'pending',
-    loop: 1
+    loop: 1,
+    priority: 0,
+    campaign: ''
   });
 
   const handleChange = (e) => {
-    const { name, value } = e.target;
-    setFormData(prev => ({ ...prev, [name]: value }));
+    const { name, value, type } = e.target;
+    setFormData(prev => ({ ...prev, [name]: type === 'number' ? Number(value) : value }));
   };
 
   const handleSubmit = (e) => {
@@ -98,6 +105,27 @@ const TaskForm = ({ task, onSave, onCancel }) => {
               required
             />
           </div>
+          <div className="mb-4">
+            <label className="block text-sm font-medium mb-1">Campaign</label>
+            <input
+              type="text"
+              name="campaign"
+              value={formData.campaign || ''}
+              onChange={handleChange}
+              placeholder="Defaults to target website domain"
+              className="w-full p-2 border rounded-md"
+            />
+          </div>
+          <div className="mb-4">
+            <label className="block text-sm font-medium mb-1">Priority</label>
+            <input
+              type="number"
+              name="priority"
+              value={formData.priority || 0}
+              onChange={handleChange}
+              className="w-full p-2 border rounded-md"
+            />
+          </div>
           <div className="mb-4">
             <label className="block text-sm font-medium mb-1">Status</label>
             <select
@@ -152,6 +180,17 @@ export default function TaskList({ tasksData, onTaskUpdate }) {
   const [isRunningTasks, setIsRunningTasks] = useState(false);
   // result of browser agent
   const [browserAgentResults, setBrowserAgentResults] = useState([])
+  // latest agent step per running task, pushed by the backend as `task-step` events
+  const [taskSteps, setTaskSteps] = useState({})
+
+  useEffect(() => {
+    const handleTaskStep = (event) => {
+      const { task_id, step, url } = event.detail
+      setTaskSteps(prev => ({ ...prev, [task_id]: { step, url } }))
+    }
+    window.addEventListener('task-step', handleTaskStep)
+    return () => window.removeEventListener('task-step', handleTaskStep)
+  }, [])
 
   useEffect(() => {
     onTaskUpdate(tasks);
@@ -272,27 +311,42 @@ export default function TaskList({ tasksData, onTaskUpdate }) {
 
     setIsRunningTasks(true)
 
-    // loop and handle async for each item doing step by step task item, and wait for all tasks to complete, and then set isRunningTasks to false, only for tasks status is pending
-    for (const task of pendingTasks) {
-      // update task status to doing
-      setTasks(prev => prev.map(t => t.id === task.id ? { ...t, status: 'doing' } : t))
-
-      console.log('___Task status updated to doing:', task)
-      const result = await browserAgent(task)
-      await delay(2000)
-
-      console.log('___Browser agent result:', result)
-
-      // set browser agent results
-      setBrowserAgentResults(prev => [...prev, {
-        taskId: task.id,
-        result: result
-      }])
-
-      // update task status to completed
-      setTasks(prev => prev.map(t => t.id === task.id ? { ...t, status: 'completed' } : t))
+    // ask the backend scheduler for the next task (priority, fair-share, rate limits) until no pending task is left
+    const runQueue = async () => {
+      while (true) {
+        const next = await window.pywebview.api.get_next_task()
+        if (next.status !== 'success' || !next.task) break
+
+        const task = next.task
+        // update task status to doing
+        setTasks(prev => prev.map(t => t.id === task.id ? { ...t, status: 'doing' } : t))
+
+        console.log('___Task status updated to doing:', task, 'wait seconds:', next.wait_seconds)
+        const result = await browserAgent(task)
+        await delay(2000)
+
+        console.log('___Browser agent result:', result)
+
+        // set browser agent results
+        setBrowserAgentResults(prev => [...prev, {
+          taskId: task.id,
+          result: result
+        }])
+
+        // captcha puts the task back in the queue until its retries are used up, the backend waits out the backoff
+        let status = 'completed'
+        if (result?.status === 'captcha') status = result.retry ? 'pending' : 'failed'
+        else if (result?.status === 'error') status = 'failed'
+        setTasks(prev => prev.map(t => t.id === task.id ? { ...t, status } : t))
+        setTaskSteps(({ [task.id]: _, ...rest }) => rest)
+      }
     }
 
+    // one runner per worker in process mode, the backend hands each runner a different task
+    const settings = await window.pywebview.api.get_execution_settings()
+    const concurrency = settings.status === 'success' ? settings.concurrency : 1
+    await Promise.all(Array.from({ length: concurrency }, runQueue))
+
     setIsRunningTasks(false)
   };
 
@@ -361,6 +415,7 @@ export default function TaskList({ tasksData, onTaskUpdate }) {
                       task={task} 
                       numIndex={index + 1}
                       onEdit={handleEdit} 
+                      step={taskSteps[task.id]}
                       onDelete={handleDelete} 
                     />
                   ))}